@@ -155,8 +155,8 @@ class AdaptablePriorityQueue:
             else:
                 # else bubble down val
                 self.bubbledown(i)
-            # return that element key and value
-            return element.key, element.value
+        # return that element key and value
+        return element.key, element.value
 
     def __str__(self):
         elt = []
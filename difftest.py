@@ -0,0 +1,408 @@
+# Differential test harness that checks every search engine and priority queue agree on random graphs
+# Louis Sullivan 119363083
+
+import argparse
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+
+from apq import AdaptablePriorityQueue
+from routemap import graphreader
+from turngraph import BANNED, TurnTable
+
+
+class ReferencePriorityQueue:
+    """ An unsorted list with the same methods as AdaptablePriorityQueue.
+
+    Every operation is a plain linear scan, so it is slow but easy to
+    trust, and is used as the oracle for the binary heap.
+    """
+
+    def __init__(self):
+        """ Create an empty queue. """
+        self.elements = []
+
+    def length(self):
+        """ Return the number of elements in the queue. """
+        return len(self.elements)
+
+    def isEmpty(self):
+        """ Return true if the queue is empty. """
+        return len(self.elements) == 0
+
+    def add(self, key, value):
+        """ Add value with key and return the handle for it. """
+        elt = [key, value]
+        self.elements.append(elt)
+        return elt
+
+    def _min_index(self):
+        """ Return the position of the element with the smallest key. """
+        best = 0
+        for i in range(1, len(self.elements)):
+            if self.elements[i][0] < self.elements[best][0]:
+                best = i
+        return best
+
+    def min(self):
+        """ Return the smallest key and its value. """
+        elt = self.elements[self._min_index()]
+        return elt[0], elt[1]
+
+    def remove_min(self):
+        """ Remove and return the smallest key and its value. """
+        elt = self.elements.pop(self._min_index())
+        return elt[0], elt[1]
+
+    def update_key(self, elt, newkey):
+        """ Change the key of the element with handle elt. """
+        elt[0] = newkey
+
+    def get_key(self, elt):
+        """ Return the key of the element with handle elt. """
+        return elt[0]
+
+    def remove(self, elt):
+        """ Remove and return the key and value of the element with handle elt. """
+        for i in range(len(self.elements)):
+            if self.elements[i] is elt:
+                self.elements.pop(i)
+                return elt[0], elt[1]
+        return None
+
+
+# priority queue classes Graph.dijkstra is run with
+QUEUES = {'apq': AdaptablePriorityQueue, 'reference': ReferencePriorityQueue}
+
+
+# ---------------------------------------------------------------------------#
+
+# Random inputs
+
+def random_map(rng, nvertices, nedges):
+    """ Return the text of a random route map in the Node/Edge file format.
+
+    Ids are spread out rather than 1..n, and a few times are zero so
+    that ties between paths are common.
+
+    Args:
+        rng - a random.Random instance
+        nvertices - the number of vertices
+        nedges - the most edges to try to add; duplicates and loops are skipped
+    """
+    ids = rng.sample(range(1, 10 * nvertices + 1), nvertices)
+    lines = []
+    for nodeid in ids:
+        lat = 51.85 + rng.random() * 0.1
+        longi = -8.55 + rng.random() * 0.15
+        lines += ['Node', 'id: {}'.format(nodeid), 'gps: {:.7f} {:.7f}'.format(lat, longi)]
+    seen = set()
+    for _ in range(nedges):
+        source, target = rng.choice(ids), rng.choice(ids)
+        if source == target or (source, target) in seen or (target, source) in seen:
+            continue
+        seen.add((source, target))
+        # small integer times make exact ties likely
+        weight = rng.choice([0, rng.randint(1, 5), rng.random() * 20])
+        lines += ['Edge', 'from: {}'.format(source), 'to: {}'.format(target),
+                  'length: {}'.format(weight / 100), 'time: {}'.format(float(weight)),
+                  'oneway: false']
+    return '\n'.join(lines) + '\n'
+
+
+def random_turn(rng, graph, turns):
+    """ Add one random banned or costed turn, possibly a U-turn, to turns. """
+    v = rng.choice(graph.vertices())
+    neighbours = [w for w, cost in graph.neighbours(v)]
+    if not neighbours:
+        return
+    u = rng.choice(neighbours)
+    x = rng.choice(neighbours)
+    if rng.random() < 0.5:
+        turns.add_turn(u.element(), v.element(), x.element(), BANNED)
+    else:
+        turns.add_turn(u.element(), v.element(), x.element(),
+                       rng.choice([0.0, float(rng.randint(1, 5)), rng.random() * 10]))
+
+
+def random_turns(rng, graph):
+    """ Return a TurnTable with a random U-turn penalty and random turns for graph. """
+    turns = TurnTable(rng.choice([0.0, float(rng.randint(1, 5)), rng.random() * 10]))
+    for _ in range(rng.randint(0, 2 * graph.num_edges())):
+        random_turn(rng, graph, turns)
+    return turns
+
+
+def load_map(text):
+    """ Write text to a temporary file and read it with graphreader. """
+    fd, filename = tempfile.mkstemp(suffix='.txt')
+    try:
+        with os.fdopen(fd, 'w') as file:
+            file.write(text)
+        return graphreader(filename, verbose=False)
+    finally:
+        os.remove(filename)
+
+
+def bellman_ford(graph, s):
+    """ Return a dict of shortest path costs from s, as the oracle for Dijkstra. """
+    dist = {s: 0.0}
+    edges = graph.edges()
+    for _ in range(graph.num_vertices()):
+        changed = False
+        for e in edges:
+            v, w = e.vertices()
+            for a, b in ((v, w), (w, v)):
+                if a in dist and (b not in dist or dist[a] + e.element() < dist[b]):
+                    dist[b] = dist[a] + e.element()
+                    changed = True
+        if not changed:
+            break
+    return dist
+
+
+def turn_bellman_ford(graph, s, turns):
+    """ Return a dict of shortest path costs from s that honour turns.
+
+    Relaxes states (previous junction, current junction), starting from
+    (None, s), then keeps the cheapest state for each junction.
+    """
+    dist = {(None, s): 0.0}
+    changed = True
+    while changed:
+        changed = False
+        for (p, c), cost in list(dist.items()):
+            for x, time in graph.neighbours(c):
+                turn = 0.0 if p is None else turns.cost(p.element(), c.element(), x.element())
+                if turn == BANNED:
+                    continue
+                newcost = cost + time + turn
+                if (c, x) not in dist or newcost < dist[(c, x)]:
+                    dist[(c, x)] = newcost
+                    changed = True
+    best = dict()
+    for (p, c), cost in dist.items():
+        if c not in best or cost < best[c]:
+            best[c] = cost
+    return best
+
+
+# ---------------------------------------------------------------------------#
+
+# Checks
+
+def same_cost(a, b):
+    """ Return true if two path costs are equal, allowing for rounding in the sums. """
+    return math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-9)
+
+
+def check_table(graph, s, table, oracle, name):
+    """ Check a Dijkstra table against the oracle costs.
+
+    Every reachable vertex must be present with the right cost, and its
+    preceding vertex must be joined to it by an edge that accounts for
+    the difference in cost.
+    """
+    if set(table) != set(oracle):
+        raise AssertionError('{}: reached {} vertices, expected {}'
+                             .format(name, len(table), len(oracle)))
+    for v, (cost, pred) in table.items():
+        if not same_cost(cost, oracle[v]):
+            raise AssertionError('{}: cost to {} is {}, expected {}'
+                                 .format(name, v, cost, oracle[v]))
+        if v is s:
+            if pred is not None:
+                raise AssertionError('{}: source has preceding vertex {}'.format(name, pred))
+            continue
+        e = graph.get_edge(pred, v)
+        if e is None or not same_cost(table[pred][0] + e.element(), cost):
+            raise AssertionError('{}: {} is not a valid preceding vertex of {}'
+                                 .format(name, pred, v))
+
+
+def check_path(graph, s, w, path, oracle, name, turns=None):
+    """ Check a RoutePath from s to w against the oracle costs.
+
+    If turns is given, no hop may take a banned turn and each cost must
+    include the turn cost.
+    """
+    if w not in oracle:
+        if path is not None:
+            raise AssertionError('{}: found a path to unreachable {}'.format(name, w))
+        return
+    if path is None:
+        raise AssertionError('{}: found no path to reachable {}'.format(name, w))
+    elements = path.elements()
+    costs = path.costs()
+    if elements[0] != s.element() or elements[-1] != w.element():
+        raise AssertionError('{}: path runs {} to {}, expected {} to {}'
+                             .format(name, elements[0], elements[-1], s, w))
+    if not same_cost(path.total(), oracle[w]):
+        raise AssertionError('{}: cost to {} is {}, expected {}'
+                             .format(name, w, path.total(), oracle[w]))
+    for i in range(1, len(elements)):
+        e = graph.get_edge(graph.get_vertex_by_label(elements[i - 1]),
+                           graph.get_vertex_by_label(elements[i]))
+        if e is None:
+            raise AssertionError('{}: hop {} -> {} is not an edge'
+                                 .format(name, elements[i - 1], elements[i]))
+        turn = 0.0
+        if turns is not None and i > 1:
+            turn = turns.cost(elements[i - 2], elements[i - 1], elements[i])
+            if turn == BANNED:
+                raise AssertionError('{}: path takes banned turn {} -> {} -> {}'
+                                     .format(name, elements[i - 2], elements[i - 1], elements[i]))
+        if not same_cost(costs[i - 1] + e.element() + turn, costs[i]):
+            raise AssertionError('{}: hop {} -> {} costs {}, expected {}'
+                                 .format(name, elements[i - 1], elements[i],
+                                         costs[i] - costs[i - 1], e.element() + turn))
+
+
+def check_sp(graph, s, w, verlist, oracle):
+    """ Check the list returned by RouteMap.sp from s to w against the oracle costs.
+
+    Each entry is the cost to a vertex on the path and the vertex before it.
+    """
+    if w is s:
+        if verlist:
+            raise AssertionError('sp: path from a vertex to itself is not empty')
+        return
+    if not same_cost(verlist[-1][0], oracle[w]):
+        raise AssertionError('sp: cost to {} is {}, expected {}'
+                             .format(w, verlist[-1][0], oracle[w]))
+    preds = [pred for cost, pred in verlist] + [w]
+    if preds[0] is not s:
+        raise AssertionError('sp: path does not start at {}'.format(s))
+    for i in range(1, len(preds)):
+        if graph.get_edge(preds[i - 1], preds[i]) is None:
+            raise AssertionError('sp: hop {} -> {} is not an edge'.format(preds[i - 1], preds[i]))
+
+
+def check_map(rng, nvertices, nedges, queries):
+    """ Run every engine on one random map and check them against the oracle.
+
+    Args:
+        rng - a random.Random instance
+        nvertices - the number of vertices in the map
+        nedges - the most edges in the map
+        queries - the number of random source/destination pairs to check
+    """
+    graph = load_map(random_map(rng, nvertices, nedges))
+    vertices = graph.vertices()
+    for _ in range(queries):
+        s = rng.choice(vertices)
+        w = rng.choice(vertices)
+        oracle = bellman_ford(graph, s)
+        for name, queue in QUEUES.items():
+            check_table(graph, s, graph.dijkstra(s, queue), oracle, 'dijkstra/' + name)
+        if w in oracle:
+            check_sp(graph, s, w, graph.sp(s, w), oracle)
+        check_path(graph, s, w, graph.route(s, w), oracle, 'route')
+        # with free turns the edge based search must find the same costs
+        check_path(graph, s, w, graph.turn_route(s, w), oracle, 'turn_route')
+    turns = random_turns(rng, graph)
+    for _ in range(queries):
+        s = rng.choice(vertices)
+        w = rng.choice(vertices)
+        # changing the table in use must not leave a stale expansion behind
+        if rng.random() < 0.3:
+            random_turn(rng, graph, turns)
+        oracle = turn_bellman_ford(graph, s, turns)
+        check_path(graph, s, w, graph.turn_route(s, w, turns), oracle, 'turn_route/turns', turns)
+
+
+def check_heap(queue):
+    """ Check that each element knows its index and no child beats its parent. """
+    elements = queue.elements
+    for i in range(len(elements)):
+        if elements[i].index != i:
+            raise AssertionError('apq: element at {} has index {}'.format(i, elements[i].index))
+        if i > 0 and elements[i].key < elements[queue.parent(i)].key:
+            raise AssertionError('apq: element at {} is smaller than its parent'.format(i))
+
+
+def check_queue(rng, operations):
+    """ Run a random sequence of operations on both queues and compare them.
+
+    Args:
+        rng - a random.Random instance
+        operations - the number of operations to run
+    """
+    queue = AdaptablePriorityQueue()
+    reference = ReferencePriorityQueue()
+    # dict where key is the value stored and value is the pair of handles
+    handles = dict()
+    nextvalue = 0
+    for _ in range(operations):
+        op = rng.random()
+        key = rng.randint(0, 20) if rng.random() < 0.5 else rng.random() * 20
+        if op < 0.4 or not handles:
+            handles[nextvalue] = (queue.add(key, nextvalue), reference.add(key, nextvalue))
+            nextvalue += 1
+        elif op < 0.6:
+            key, value = queue.remove_min()
+            refkey, refvalue = reference.min()
+            if key != refkey or value not in handles or handles[value][0].key != key:
+                raise AssertionError('apq: remove_min gave {}, expected key {}'.format(key, refkey))
+            # equal keys may come out in any order, so remove the same value from the reference
+            reference.remove(handles.pop(value)[1])
+        elif op < 0.85:
+            elt, refelt = handles[rng.choice(list(handles))]
+            queue.update_key(elt, key)
+            reference.update_key(refelt, key)
+            if queue.get_key(elt) != key:
+                raise AssertionError('apq: update_key left key {}, expected {}'
+                                     .format(queue.get_key(elt), key))
+        else:
+            value = rng.choice(list(handles))
+            elt, refelt = handles.pop(value)
+            got = queue.remove(elt)
+            expected = reference.remove(refelt)
+            if got != expected:
+                raise AssertionError('apq: remove gave {}, expected {}'.format(got, expected))
+        check_heap(queue)
+        if queue.length() != reference.length():
+            raise AssertionError('apq: length {}, expected {}'.format(queue.length(), reference.length()))
+        if not queue.isEmpty() and queue.min()[0] != reference.min()[0]:
+            raise AssertionError('apq: min key {}, expected {}'.format(queue.min()[0], reference.min()[0]))
+
+
+def run_seed(seed):
+    """ Run the queue and map checks for one seed, scaling size with the seed. """
+    rng = random.Random(seed)
+    check_queue(rng, 50 + seed % 200)
+    nvertices = 2 + seed % 40
+    check_map(rng, nvertices, rng.randint(0, 3 * nvertices), 5)
+
+
+# ---------------------------------------------------------------------------#
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Differential tests for the APQ and the route searches.')
+    parser.add_argument('--seeds', type=int, default=200, help='number of seeds to run')
+    parser.add_argument('--start', type=int, default=0, help='first seed to run')
+    parser.add_argument('--fuzz', type=float, metavar='SECONDS',
+                        help='keep running new seeds until SECONDS have passed')
+    args = parser.parse_args(argv)
+    seed = args.start
+    begin = time.time()
+    while True:
+        if args.fuzz is None and seed >= args.start + args.seeds:
+            break
+        if args.fuzz is not None and time.time() - begin >= args.fuzz:
+            break
+        try:
+            run_seed(seed)
+        except AssertionError as err:
+            print('Seed', seed, 'failed:', err)
+            return 1
+        seed += 1
+    print('Passed', seed - args.start, 'seeds in', round(time.time() - begin, 1), 'seconds')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
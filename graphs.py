@@ -2,7 +2,7 @@
 # Louis Sullivan 119363083
 
 
-from apq import *
+from apq import AdaptablePriorityQueue
 
 
 class Vertex:
@@ -184,6 +184,17 @@ class Graph:
             return self._structure[v][w]
         return None
 
+    def neighbours(self, v):
+        """ Return a list of (opposite vertex, edge element) pairs for the edges incident on v.
+
+        This is all Dijkstra needs from a graph, so subclasses that store
+        their edges differently only have to provide this.
+
+        Args:
+            v - a vertex object
+        """
+        return [(w, e.element()) for w, e in self._structure[v].items()]
+
     def degree(self, v):
         """ Return the degree of vertex v.
 
@@ -312,9 +323,18 @@ class Graph:
                     queue.append(w)
         return marked
 
-    def dijkstra(self, s):
+    def dijkstra(self, s, apq=AdaptablePriorityQueue):
+        """
+            Return a dict where each vertex reachable from s is a key and its value
+            is the pair (cost of the shortest path from s, preceding vertex).
+
+        Args:
+            s - the source vertex
+            apq - the adaptable priority queue class used for the open vertices
+
+        """
         # open starts as an empty APQ
-        open = AdaptablePriorityQueue()
+        open = apq()
         # empty dict keys are vertices, values are location in open)
         locs = {}
         # empty dict
@@ -331,14 +351,12 @@ class Graph:
             locs.pop(v)
             # remove v from preds and add v, the returned value from preds is added to closed
             closed[v] = (key, preds.pop(v))
-            # for each edge e in v
-            for e in self.get_edges(v):
-                # get the edge opposite v and set it to w
-                w = e.opposite(v)
+            # for each vertex w opposite v and the cost of the edge between them
+            for w, cost in self.neighbours(v):
                 # while w is not in the closed dict
                 if w not in closed:
-                    # set newcost to v's keus plus e's cost
-                    newcost = key + e.element()
+                    # set newcost to v's key plus the cost of the edge to w
+                    newcost = key + cost
                     # if w not in the dict locs
                     if w not in locs:
                         # add w:v to preds
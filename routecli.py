@@ -0,0 +1,228 @@
+# Command line entry point that answers a file of route queries against a map file or snapshot
+# Louis Sullivan 119363083
+
+# only light modules are imported here; the graph code, json and the turn
+# expansion are imported when a stage first needs them
+import argparse
+import sys
+import time
+
+
+class Timer:
+    """ Running totals of the time spent in each stage of a batch. """
+
+    def __init__(self):
+        """ Create a timer with no stages recorded. """
+        self._stages = dict()
+
+    def add(self, stage, start):
+        """ Add the time since start to stage.
+
+        Args:
+            stage - the name of the stage
+            start - the time.perf_counter() value when the stage began
+        """
+        self._stages[stage] = self._stages.get(stage, 0.0) + time.perf_counter() - start
+
+    def report(self, file):
+        """ Write one tab-separated line per stage to file. """
+        for stage, seconds in self._stages.items():
+            print(stage, '{:.6f}'.format(seconds), sep='\t', file=file)
+
+
+def load(filename, snapshot):
+    """ Read and return the route map in filename, a snapshot if snapshot is true.
+
+    Raises OSError if the file cannot be read, and ValueError or IndexError
+    if it is not a valid map or snapshot.
+    """
+    if snapshot:
+        import pickle
+        from routemap import load_snapshot
+        try:
+            return load_snapshot(filename)
+        except (pickle.UnpicklingError, EOFError) as e:
+            raise ValueError(str(e))
+    from routemap import graphreader
+    return graphreader(filename, verbose=False)
+
+
+def read_turns(args):
+    """ Read and return the TurnTable in the turn file, or None if there is none.
+
+    Only the table is read here; the expansion is built when the first
+    query arrives.
+    """
+    if not args.turns:
+        return None
+    from turngraph import turnreader
+    return turnreader(args.turns, args.uturn, verbose=False)
+
+
+def read_queries(file):
+    """ Yield (line number, source, dest) for each query line of file.
+
+    Blank lines and lines starting with '#' are skipped. Lines that are
+    not exactly two integer ids give None for source and dest.
+    """
+    for number, line in enumerate(file, 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        fields = line.split()
+        try:
+            if len(fields) != 2:
+                raise ValueError
+            source, dest = int(fields[0]), int(fields[1])
+        except ValueError:
+            yield number, None, None
+        else:
+            yield number, source, dest
+
+
+def failed(err, filename, reason):
+    """ Write '<file>: <reason>' to err.
+
+    @return: the exit status for a failed job
+    """
+    print('{}: {}'.format(filename, reason), file=err)
+    return 1
+
+
+def format_tsv(source, dest, path):
+    """ Return one tab-separated result line; the cost is empty if there is no route. """
+    if path is None:
+        source = '' if source is None else source
+        dest = '' if dest is None else dest
+        return '{}\t{}\t\t\t\t'.format(source, dest)
+    return '{}\t{}\t{}\t{}\t{}\t{}'.format(source, dest, path.total(), path.distance(),
+                                          len(path) - 1, path.polyline())
+
+
+def format_json(source, dest, path):
+    """ Return one JSON result line; the cost is null if there is no route. """
+    import json
+    if path is None:
+        result = {'source': source, 'dest': dest, 'cost': None}
+    else:
+        result = {'source': source, 'dest': dest, 'cost': path.total(),
+                  'distance': path.distance(), 'hops': len(path) - 1,
+                  'polyline': path.polyline()}
+    return json.dumps(result)
+
+
+def answer(graph, turns, queries, args, timer, out, err):
+    """ Answer every query in the file queries and write the results to out.
+
+    Every query line gets exactly one result line; bad lines and unknown
+    ids get an empty result. The turn expansion is only built once there
+    is a query to answer.
+
+    @return: the exit status
+    """
+    formatter = format_json if args.format == 'json' else format_tsv
+    if args.format == 'tsv' and args.header:
+        print('source\tdest\tcost\tdistance\thops\tpolyline', file=out)
+    indexed = False
+    status = 0
+    for number, source, dest in read_queries(queries):
+        start = time.perf_counter()
+        path = None
+        if source is None:
+            print('Bad query on line', number, file=err)
+            status = 1
+        else:
+            if turns is not None and not indexed:
+                graph.edge_graph(turns)
+                indexed = True
+                timer.add('index', start)
+                start = time.perf_counter()
+            try:
+                v = graph.get_vertex_by_label(source)
+                w = graph.get_vertex_by_label(dest)
+            except KeyError as e:
+                print('Unknown vertex', e, 'on line', number, file=err)
+                status = 1
+            else:
+                path = graph.turn_route(v, w, turns) if turns is not None else graph.route(v, w)
+        print(formatter(source, dest, path), file=out)
+        timer.add('query', start)
+    if args.save_snapshot and turns is not None and not indexed:
+        # make sure the snapshot carries the expansion for the turn file
+        start = time.perf_counter()
+        graph.edge_graph(turns)
+        timer.add('index', start)
+    return status
+
+
+def run(args, out, err):
+    """ Load the map, answer every query, and save a snapshot if asked.
+
+    @return: the exit status
+    """
+    timer = Timer()
+    start = time.perf_counter()
+    try:
+        graph = load(args.map, args.snapshot)
+    except UnicodeDecodeError:
+        return failed(err, args.map, 'not a text map, use --snapshot to load a snapshot')
+    except OSError as e:
+        return failed(err, args.map, e.strerror)
+    except (ValueError, IndexError) as e:
+        kind = 'snapshot' if args.snapshot else 'map'
+        return failed(err, args.map, 'not a valid {} ({})'.format(kind, e))
+    timer.add('load', start)
+    # read the turn file before any output, so a bad one stops the job cleanly
+    start = time.perf_counter()
+    try:
+        turns = read_turns(args)
+    except OSError as e:
+        return failed(err, args.turns, e.strerror)
+    except (ValueError, IndexError) as e:
+        return failed(err, args.turns, 'not a valid turn file ({})'.format(e))
+    timer.add('index', start)
+    if args.queries == '-':
+        status = answer(graph, turns, sys.stdin, args, timer, out, err)
+    else:
+        try:
+            queries = open(args.queries, 'r')
+        except OSError as e:
+            return failed(err, args.queries, e.strerror)
+        with queries:
+            status = answer(graph, turns, queries, args, timer, out, err)
+    if args.save_snapshot:
+        from routemap import save_snapshot
+        start = time.perf_counter()
+        try:
+            save_snapshot(graph, args.save_snapshot)
+        except OSError as e:
+            return failed(err, args.save_snapshot, e.strerror)
+        timer.add('save', start)
+    if args.profile:
+        timer.report(err)
+    return status
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Answer a file of route queries against a map.')
+    parser.add_argument('map', help='map file in the Node/Edge format, or a snapshot with --snapshot')
+    parser.add_argument('queries', help="file of 'source dest' lines, or - for stdin")
+    parser.add_argument('--snapshot', action='store_true',
+                        help='the map is a snapshot from --save-snapshot; only load snapshots you trust')
+    parser.add_argument('--format', choices=['tsv', 'json'], default='tsv',
+                        help='tab-separated lines or one JSON object per line')
+    parser.add_argument('--header', action='store_true', help='write a header line before TSV results')
+    parser.add_argument('--turns', help='turn cost file, enables turn aware routing')
+    parser.add_argument('--uturn', type=float, default=0.0,
+                        help='cost of U-turns not listed in the turn file')
+    parser.add_argument('--save-snapshot', metavar='FILE',
+                        help='write the map, and the turn expansion if --turns is given, '
+                             'to FILE for faster loading next time')
+    parser.add_argument('--profile', action='store_true',
+                        help='write the time spent loading, indexing and querying to stderr')
+    args = parser.parse_args(argv)
+    return run(args, sys.stdout, sys.stderr)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,6 +3,7 @@
 
 from graphs import Vertex
 from graphs import Graph
+from routepath import build_path
 
 
 class RouteMap(Graph):
@@ -12,6 +13,9 @@ class RouteMap(Graph):
         self._faststruct = dict()
         # dict where key is the element and value is lat, long of that element
         self._coords = dict()
+        # edge based expansion and the fingerprint of the turn table it was built with, made on first use
+        self._edgegraph = None
+        self._edgekey = None
 
     def __str__(self):
         """
@@ -41,8 +45,19 @@ class RouteMap(Graph):
         # element is key and value is the vertex object of that key
         self._faststruct[element] = v
         self._structure[v] = dict()
+        # the expansion no longer matches the graph
+        self._edgegraph = None
         return v
 
+    def add_edge(self, v, w, element):
+        """
+        Add an edge and drop any edge based expansion of the old graph
+
+        @return: the new edge or None
+        """
+        self._edgegraph = None
+        return super().add_edge(v, w, element)
+
     def get_vertex_by_label(self, element):
         """ Return the element from our dictionary """
         return self._faststruct[element]
@@ -65,10 +80,7 @@ class RouteMap(Graph):
 
         @return: the coords or None
         """
-        for key, v in self._coords.items():
-            if key == element:
-                return v[0], v[1]
-        return None
+        return self._coords.get(element)
 
     def sp(self, v, w):
         """
@@ -95,11 +107,49 @@ class RouteMap(Graph):
         # reverse the list so source is at the top
         return verlist[::-1]
 
+    def route(self, v, w):
+        """
+        Call Dijkstra's method for source v and fill a RoutePath to w
+            in a single pass back along the preceding vertices
+
+        @return: the RoutePath from v to w or None if w is unreachable
+        """
+        table = self.dijkstra(v)
+        if w not in table:
+            return None
+        return build_path(table, w, self.get_coords)
+
+    def edge_graph(self, turns=None):
+        """
+        Return the edge based expansion of this map for the turn table,
+            building it only if the map or the table has changed
+
+        @return: the EdgeGraph
+        """
+        # any table with the same turns, such as one read again from the file a
+        # snapshot was indexed with, can use the existing expansion
+        key = None if turns is None else turns.fingerprint()
+        if self._edgegraph is None or self._edgekey != key:
+            # only maps used with turns pay for importing the expansion
+            from turngraph import EdgeGraph
+            self._edgegraph = EdgeGraph(self, turns)
+            self._edgekey = key
+        return self._edgegraph
+
+    def turn_route(self, v, w, turns=None):
+        """
+        Find the route from v to w that honours the turn costs and banned
+            turns in the turn table
+
+        @return: the RoutePath from v to w or None if w is unreachable
+        """
+        return self.edge_graph(turns).route(v, w)
+
 
 # -----------------------------------------------
 
-def graphreader(filename):
-    """ Read and return the route map in variable. """
+def graphreader(filename, verbose=True):
+    """ Read and return the route map in variable, printing progress if verbose. """
     graph = RouteMap()
     file = open(filename, 'r')
     entry = file.readline()
@@ -116,7 +166,8 @@ def graphreader(filename):
         # add coords to dict
         coords = graph.add_coords(nodeid, lat, longi)
         entry = file.readline()
-    print('Read', num, 'vertices and added into the graph')
+    if verbose:
+        print('Read', num, 'vertices and added into the graph')
     num = 0
     while entry == 'Edge\n':
         num += 1
@@ -132,11 +183,52 @@ def graphreader(filename):
         # read one way data
         file.readline()
         entry = file.readline()
-    print('Read', num, 'edges and added into the graph')
-    print(graph)
+    file.close()
+    if verbose:
+        print('Read', num, 'edges and added into the graph')
+        print(graph)
     return graph
 
 
+def save_snapshot(graph, filename):
+    """ Write the route map to filename so it can be loaded without parsing.
+
+    The turn expansion and the fingerprint of its turn table are saved too
+    if they have been built, so jobs using the same turn file do not rebuild it.
+
+    The snapshot is written to a temporary file in the same directory and
+    then moved into place, so a job loading it never sees a partial file.
+    """
+    # only jobs that save or load snapshots pay for importing these
+    import os
+    import pickle
+    import tempfile
+    fd, tmpname = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(filename)),
+                                   prefix='.' + os.path.basename(filename), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            pickle.dump(graph, file, pickle.HIGHEST_PROTOCOL)
+        # mkstemp makes the file private; give it the mode open() would have
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(tmpname, 0o666 & ~umask)
+        os.replace(tmpname, filename)
+    except BaseException:
+        os.remove(tmpname)
+        raise
+
+
+def load_snapshot(filename):
+    """ Read and return a route map written by save_snapshot.
+
+    Snapshots are pickles, and loading one can run arbitrary code, so
+    only load snapshots you wrote yourself.
+    """
+    import pickle
+    with open(filename, 'rb') as file:
+        return pickle.load(file)
+
+
 def main():
     # uncomment this if you want to run the simple route
     # routemap = graphreader('simpleroute.txt')
@@ -150,11 +242,11 @@ def main():
     deststr = 'neptune'
     source = routemap.get_vertex_by_label(ids[sourcestr])
     dest = routemap.get_vertex_by_label(ids[deststr])
-    tree = routemap.sp(source, dest)
+    path = routemap.route(source, dest)
+    # one row per vertex from the source (cost 0) to the destination, each with its own cost
     print("type\tlatitude\tlongitude\telement\tcost")
-    for val in tree:
-        coords = routemap.get_coords(val[1])
-        print("W", "\t", coords[0], "\t", coords[1], "\t", val[1], "\t", val[0])
+    for element, cost, lat, longi in path:
+        print("W", "\t", lat, "\t", longi, "\t", element, "\t", cost)
 
 
 if __name__ == '__main__':
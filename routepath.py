@@ -0,0 +1,169 @@
+# Compact result of a route search, backed by typed arrays instead of per-hop tuples
+# Louis Sullivan 119363083
+
+from array import array
+from math import asin, cos, radians, sin, sqrt
+
+# mean radius of the earth in metres, used for the haversine distance
+EARTH_RADIUS = 6371008.8
+
+
+class RoutePath:
+    """ A path through a RouteMap from a source to a destination.
+
+    Each hop is stored as one slot in four parallel arrays: the vertex
+    element, the cumulative cost from the source, and the latitude and
+    longitude of the vertex. Vertex elements must be integers, as they
+    are for every map read in by graphreader.
+    """
+
+    def __init__(self):
+        """ Create an empty path. """
+        self._elements = array('q')
+        self._costs = array('d')
+        self._lats = array('d')
+        self._longs = array('d')
+
+    def __len__(self):
+        """ Return the number of vertices on the path. """
+        return len(self._elements)
+
+    def __iter__(self):
+        """ Lazily yield (element, cost, latitude, longitude) for each hop. """
+        for i in range(len(self._elements)):
+            yield self._elements[i], self._costs[i], self._lats[i], self._longs[i]
+
+    def __str__(self):
+        """ Return a short summary of the path. """
+        if not self._elements:
+            return 'Empty path'
+        return ('{} -> {} : {} hops, cost {}'
+                .format(self.source(), self.dest(), len(self) - 1, self.total()))
+
+    # ---------------------------------------------------------------------#
+
+    # Methods used while filling the path
+
+    def append(self, element, cost, lat, longi):
+        """ Add a hop to the end of the path.
+
+        Args:
+            element - the integer label of the vertex
+            cost - the cost of the path from the source to this vertex
+            lat - the latitude of the vertex
+            longi - the longitude of the vertex
+        """
+        self._elements.append(element)
+        self._costs.append(cost)
+        self._lats.append(lat)
+        self._longs.append(longi)
+
+    def reverse(self):
+        """ Reverse the path in place, for paths built from the destination back. """
+        self._elements.reverse()
+        self._costs.reverse()
+        self._lats.reverse()
+        self._longs.reverse()
+
+    # ---------------------------------------------------------------------#
+
+    # Summary methods
+
+    def source(self):
+        """ Return the element of the first vertex, or None if empty. """
+        return self._elements[0] if self._elements else None
+
+    def dest(self):
+        """ Return the element of the last vertex, or None if empty. """
+        return self._elements[-1] if self._elements else None
+
+    def total(self):
+        """ Return the total cost of the path. """
+        return self._costs[-1] if self._costs else 0.0
+
+    def elements(self):
+        """ Return the array of vertex elements. """
+        return self._elements
+
+    def costs(self):
+        """ Return the array of cumulative costs. """
+        return self._costs
+
+    def distance(self):
+        """ Return the great-circle length of the path in metres. """
+        lats = self._lats
+        longs = self._longs
+        total = 0.0
+        for i in range(1, len(lats)):
+            # haversine formula between consecutive hops
+            dlat = radians(lats[i] - lats[i - 1])
+            dlong = radians(longs[i] - longs[i - 1])
+            a = (sin(dlat / 2) ** 2
+                 + cos(radians(lats[i - 1])) * cos(radians(lats[i])) * sin(dlong / 2) ** 2)
+            total += 2 * EARTH_RADIUS * asin(sqrt(a))
+        return total
+
+    def polyline(self, precision=5):
+        """ Return the path encoded with the Google polyline algorithm.
+
+        Args:
+            precision - the number of decimal places kept for each coordinate
+        """
+        factor = 10 ** precision
+        chunks = []
+        prevlat = 0
+        prevlong = 0
+        for i in range(len(self._lats)):
+            lat = int(round(self._lats[i] * factor))
+            longi = int(round(self._longs[i] * factor))
+            _encode_value(lat - prevlat, chunks)
+            _encode_value(longi - prevlong, chunks)
+            prevlat = lat
+            prevlong = longi
+        return ''.join(chunks)
+
+    def geojson(self):
+        """ Return the path as a GeoJSON Feature with a LineString geometry.
+
+        GeoJSON orders each position as [longitude, latitude].
+        """
+        coords = [[self._longs[i], self._lats[i]] for i in range(len(self._lats))]
+        return {'type': 'Feature',
+                'geometry': {'type': 'LineString', 'coordinates': coords},
+                'properties': {'source': self.source(), 'dest': self.dest(),
+                               'cost': self.total(), 'distance': self.distance()}}
+
+
+def build_path(table, w, coords, project=None):
+    """ Return the RoutePath ending at w from a Dijkstra table.
+
+    Walks back along the preceding vertices in one pass, then reverses
+    the arrays so the source is first.
+
+    Args:
+        table - the dict returned by Graph.dijkstra
+        w - the key of the destination in table
+        coords - a function returning (latitude, longitude) for a vertex
+        project - a function mapping a key of table to the vertex it stands
+            for, or None if the keys are the vertices themselves
+    """
+    path = RoutePath()
+    currentval = w
+    while currentval is not None:
+        cost, pred = table[currentval]
+        vertex = currentval if project is None else project(currentval)
+        lat, longi = coords(vertex)
+        path.append(vertex.element(), cost, lat, longi)
+        currentval = pred
+    path.reverse()
+    return path
+
+
+def _encode_value(value, chunks):
+    """ Append the polyline encoding of a single signed delta to chunks. """
+    # left shift and invert negative values so the sign sits in the low bit
+    value = ~(value << 1) if value < 0 else value << 1
+    while value >= 0x20:
+        chunks.append(chr((0x20 | (value & 0x1f)) + 63))
+        value >>= 5
+    chunks.append(chr(value + 63))
@@ -0,0 +1,325 @@
+# Edge-based (line graph) expansion of a RouteMap so that Dijkstra can honour turn costs and banned turns
+# Louis Sullivan 119363083
+
+import hashlib
+from array import array
+
+from graphs import Edge
+from graphs import Graph
+from routepath import build_path
+
+# turn cost used to mark a turn that may not be taken
+BANNED = float('inf')
+
+
+class TurnTable:
+    """ Costs for turning from one road segment onto the next.
+
+    A turn is identified by the elements of three junctions: the one
+    we come from, the one we turn at, and the one we go to. Turns not
+    in the table are free, except U-turns (from and to the same
+    junction) which cost the default uturn penalty.
+    """
+
+    def __init__(self, uturn=0.0):
+        """ Create an empty turn table.
+
+        Args:
+            uturn - the cost of any U-turn not listed in the table
+        """
+        self._costs = dict()
+        self._uturn = uturn
+        # fingerprint of the current turns, worked out on first use and cleared on every change
+        self._fingerprint = None
+
+    def __len__(self):
+        """ Return the number of turns listed in the table. """
+        return len(self._costs)
+
+    def add_turn(self, source, via, target, cost):
+        """ Set the cost of turning at via from source onto target.
+
+        Args:
+            source - the element of the junction we come from
+            via - the element of the junction we turn at
+            target - the element of the junction we go to
+            cost - the extra cost of the turn, or BANNED
+        """
+        self._costs[(source, via, target)] = cost
+        self._fingerprint = None
+
+    def cost(self, source, via, target):
+        """ Return the cost of turning at via from source onto target. """
+        cost = self._costs.get((source, via, target))
+        if cost is not None:
+            return cost
+        if source == target:
+            return self._uturn
+        return 0.0
+
+    def fingerprint(self):
+        """ Return a digest of the U-turn penalty and every turn cost.
+
+        Two tables with the same turns have the same fingerprint, so an
+        expansion only needs to keep this, not the table it was built from.
+        """
+        if self._fingerprint is None:
+            turns = sorted(self._costs.items())
+            self._fingerprint = hashlib.sha256(repr((self._uturn, turns)).encode()).hexdigest()
+        return self._fingerprint
+
+
+class EdgeGraph(Graph):
+    """ Directed line graph of a RouteMap, stored as packed arrays.
+
+    Vertices are integers. Vertex i < n is the start vertex of the i-th
+    junction of the RouteMap, with edges to every segment leaving it, so
+    a search can begin at a junction. Every other vertex is a directed
+    road segment (u, v), with an edge to each segment (v, x) unless that
+    turn is banned, weighted by the time of (v, x) plus the turn cost.
+
+    The edges leaving vertex i are targets[offsets[i]:offsets[i + 1]],
+    with costs at the same positions in weights. The graph is fixed once
+    built; build it once per RouteMap and turn table and reuse it.
+    """
+
+    def __init__(self, routemap, turns=None):
+        """ Build the line graph of routemap.
+
+        Args:
+            routemap - the RouteMap to expand
+            turns - a TurnTable, or None for free turns
+        """
+        super().__init__()
+        if turns is None:
+            turns = TurnTable()
+        self._routemap = routemap
+        # list where index is a junction number and value is the junction vertex
+        self._junctions = routemap.vertices()
+        # dict where key is a junction vertex and value is its number
+        self._index = {v: i for i, v in enumerate(self._junctions)}
+        # junction number each vertex ends at; a start vertex ends at its own junction
+        self._heads = array('i')
+        self._offsets = array('i')
+        self._targets = array('i')
+        self._weights = array('d')
+        # segments ending at junction i are arrivals[arrivaloffsets[i]:arrivaloffsets[i + 1]]
+        self._arrivaloffsets = array('i')
+        self._arrivals = array('i')
+        self._build(turns)
+
+    def _build(self, turns):
+        """ Fill the arrays for the start vertices, segments and turns. """
+        n = len(self._junctions)
+        elements = [v.element() for v in self._junctions]
+        heads = self._heads
+        heads.extend(range(n))
+        # the tail junction and time of each vertex, only needed while building
+        tails = array('i', range(n))
+        times = array('d', [0.0]) * n
+        # segments leaving junction i are numbered leaving[i] to leaving[i + 1] - 1
+        leaving = array('i')
+        for i, u in enumerate(self._junctions):
+            leaving.append(len(heads))
+            for w, time in self._routemap.neighbours(u):
+                heads.append(self._index[w])
+                tails.append(i)
+                times.append(time)
+        leaving.append(len(heads))
+        offsets = self._offsets
+        targets = self._targets
+        weights = self._weights
+        for node in range(len(heads)):
+            offsets.append(len(targets))
+            if node < n:
+                # a start vertex enters each segment leaving its junction
+                for seg in range(leaving[node], leaving[node + 1]):
+                    targets.append(seg)
+                    weights.append(times[seg])
+                continue
+            u = tails[node]
+            v = heads[node]
+            # join the segment to the segments leaving its head, skipping banned turns
+            for seg in range(leaving[v], leaving[v + 1]):
+                turn = turns.cost(elements[u], elements[v], elements[heads[seg]])
+                if turn != BANNED:
+                    targets.append(seg)
+                    weights.append(times[seg] + turn)
+        offsets.append(len(targets))
+        # count the segments ending at each junction, then place them
+        counts = array('i', [0]) * (n + 1)
+        for seg in range(n, len(heads)):
+            counts[heads[seg] + 1] += 1
+        for i in range(n):
+            counts[i + 1] += counts[i]
+        self._arrivaloffsets = array('i', counts)
+        self._arrivals = array('i', [0]) * (len(heads) - n)
+        for seg in range(n, len(heads)):
+            self._arrivals[counts[heads[seg]]] = seg
+            counts[heads[seg]] += 1
+
+    # ---------------------------------------------------------------------#
+
+    # Graph methods changed for the packed arrays; the graph cannot be modified
+
+    def add_vertex(self, element):
+        """ Raise TypeError, as the expansion is fixed once built. """
+        raise TypeError('an EdgeGraph cannot be modified, build a new one from the RouteMap')
+
+    def add_vertex_if_new(self, element):
+        """ Raise TypeError, as the expansion is fixed once built. """
+        raise TypeError('an EdgeGraph cannot be modified, build a new one from the RouteMap')
+
+    def add_edge(self, v, w, element):
+        """ Raise TypeError, as the expansion is fixed once built. """
+        raise TypeError('an EdgeGraph cannot be modified, build a new one from the RouteMap')
+
+    def add_edge_pairs(self, elist):
+        """ Raise TypeError, as the expansion is fixed once built. """
+        raise TypeError('an EdgeGraph cannot be modified, build a new one from the RouteMap')
+
+    def get_vertex_by_label(self, element):
+        """ Return element if it is a vertex number of the graph, else None. """
+        if isinstance(element, int) and 0 <= element < len(self._heads):
+            return element
+        return None
+
+    def highestdegreevertex(self):
+        """ Return the vertex with the most edges leaving it. """
+        hd = -1
+        hdv = None
+        for v in range(len(self._heads)):
+            if self.degree(v) > hd:
+                hd = self.degree(v)
+                hdv = v
+        return hdv
+
+    def __str__(self):
+        """ Return the size of the graph; the vertices are only numbers. """
+        return '|V| = ' + str(self.num_vertices()) + '; |E| = ' + str(self.num_edges())
+
+    def num_vertices(self):
+        """ Return the number of vertices in the graph. """
+        return len(self._heads)
+
+    def num_edges(self):
+        """ Return the number of directed edges in the graph. """
+        return len(self._targets)
+
+    def vertices(self):
+        """ Return a list of all vertices in the graph. """
+        return list(range(len(self._heads)))
+
+    def edges(self):
+        """ Return a list of all edges in the graph. """
+        edgelist = []
+        for v in range(len(self._heads)):
+            edgelist += self.get_edges(v)
+        return edgelist
+
+    def get_edges(self, v):
+        """ Return a list of new Edge objects for the edges leaving v.
+
+        Args:
+            v - a vertex number
+        """
+        return [Edge(v, w, cost) for w, cost in self.neighbours(v)]
+
+    def get_edge(self, v, w):
+        """ Return a new Edge object from v to w, or None.
+
+        Args:
+            v - a vertex number
+            w - a vertex number
+        """
+        for x, cost in self.neighbours(v):
+            if x == w:
+                return Edge(v, w, cost)
+        return None
+
+    def degree(self, v):
+        """ Return the number of edges leaving v.
+
+        Args:
+            v - a vertex number
+        """
+        return self._offsets[v + 1] - self._offsets[v]
+
+    def neighbours(self, v):
+        """ Return (vertex, cost) pairs for the edges leaving v, read from the arrays.
+
+        Args:
+            v - a vertex number
+        """
+        lo = self._offsets[v]
+        hi = self._offsets[v + 1]
+        return zip(self._targets[lo:hi], self._weights[lo:hi])
+
+    # ---------------------------------------------------------------------#
+
+    # Route finding on the original junctions
+
+    def junction(self, v):
+        """ Return the RouteMap vertex that line graph vertex v ends at. """
+        return self._junctions[self._heads[v]]
+
+    def route(self, v, w):
+        """ Return the cheapest RoutePath between two junctions, or None.
+
+        Runs Dijkstra from the start vertex of v and projects the best
+        segment ending at w back onto the junctions of the RouteMap.
+
+        Args:
+            v - a vertex object of the RouteMap
+            w - a vertex object of the RouteMap
+        """
+        start = self._index[v]
+        table = self.dijkstra(start)
+        if v is w:
+            candidates = [start]
+        else:
+            i = self._index[w]
+            candidates = self._arrivals[self._arrivaloffsets[i]:self._arrivaloffsets[i + 1]]
+        best = None
+        for seg in candidates:
+            if seg in table and (best is None or table[seg][0] < table[best][0]):
+                best = seg
+        if best is None:
+            return None
+        return build_path(table, best, self._routemap.get_coords, self.junction)
+
+
+# ---------------------------------------------------------------------------#
+
+def turnreader(filename, uturn=0.0, verbose=True):
+    """ Read and return the turn table in filename, printing progress if verbose.
+
+    Each turn is written in the same style as the map files:
+
+        Turn
+        from: 1
+        via: 2
+        to: 4
+        cost: 5.0
+
+    where cost may also be 'banned'.
+    """
+    turns = TurnTable(uturn)
+    file = open(filename, 'r')
+    entry = file.readline()
+    num = 0
+    while entry == 'Turn\n':
+        num += 1
+        source = int(file.readline().split()[1])
+        via = int(file.readline().split()[1])
+        target = int(file.readline().split()[1])
+        cost = file.readline().split()[1]
+        if cost == 'banned':
+            turns.add_turn(source, via, target, BANNED)
+        else:
+            turns.add_turn(source, via, target, float(cost))
+        entry = file.readline()
+    file.close()
+    if verbose:
+        print('Read', num, 'turns and added into the table')
+    return turns